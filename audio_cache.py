@@ -0,0 +1,239 @@
+"""
+A size-bounded cache of synthesized audio files. Entries are keyed by the text and voice settings used for synthesis and are evicted least recently used first once the cache exceeds its size limit. An index of the entries is kept in the cache directory so the cache is reused across runs, and is reconciled with the files in the directory on load so files cached by a run which didn't exit cleanly are still counted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Cached audio files are named by their sha256 cache key followed by the file extension
+CACHED_FILENAME = re.compile(r"^([0-9a-f]{64})\.[^.]+$")
+
+# Age after which a temporary file is assumed to be left over from a run which didn't exit cleanly, rather than being written by a run sharing the cache
+STALE_TEMP_FILE_SECONDS = 60 * 60
+
+class AudioCache:
+    """
+    Caches synthesized audio files on disk with least recently used eviction.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(
+            self,
+            cache_dir: str,
+            max_bytes: int
+        ):
+        """
+        :param cache_dir: The directory to store cached audio files and the index in.
+        :param max_bytes: The maximum total size of the cached audio files.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, self.INDEX_FILE)
+        self._lock = threading.Lock()
+        self._entries = self._load_index()
+        self._total_bytes = sum(entry["size"] for entry in self._entries.values())
+        with self._lock:
+            self._evict()
+
+    def _read_index(self) -> OrderedDict:
+        """
+        Read the cache index, ordered from least to most recently used. A missing or malformed index is treated as empty.
+
+        :return: The indexed cache entries keyed by cache key.
+        """
+        try:
+            with open(self.index_path, "r") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return OrderedDict()
+        except (OSError, ValueError) as e:
+            logging.warning(f"Failed to load audio cache index {self.index_path}: {e}")
+            return OrderedDict()
+
+        try:
+            return OrderedDict(
+                (key, {
+                    "filename": str(entry["filename"]),
+                    "size": int(entry["size"]),
+                    "last_used": float(entry["last_used"]),
+                    "hits": int(entry["hits"])
+                })
+                for key, entry in sorted(entries.items(), key=lambda item: item[1]["last_used"])
+            )
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logging.warning(f"Ignoring malformed audio cache index {self.index_path}: {e!r}")
+            return OrderedDict()
+
+    def _load_index(self) -> OrderedDict:
+        """
+        Load the cache index and reconcile it with the cache directory. Indexed entries whose files no longer exist are dropped, cached files missing from the index are adopted using their modification time as their last use, and temporary files old enough to be left over from an unclean exit are removed.
+
+        :return: The cache entries keyed by cache key, ordered from least to most recently used.
+        """
+        indexed = self._read_index()
+
+        files = {}
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for dir_entry in it:
+                    if not dir_entry.is_file() or dir_entry.name == self.INDEX_FILE:
+                        continue
+                    # Files may be renamed or evicted by another run sharing the cache while scanning
+                    try:
+                        stat = dir_entry.stat()
+                        if not dir_entry.name.endswith(".tmp"):
+                            files[dir_entry.name] = stat
+                        elif time.time() - stat.st_mtime >= STALE_TEMP_FILE_SECONDS:
+                            os.remove(dir_entry.path)
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        logging.warning(f"Failed to reconcile cache file {dir_entry.path}: {e}")
+        except OSError as e:
+            logging.warning(f"Failed to scan audio cache directory {self.cache_dir}: {e}")
+
+        entries = {}
+        for key, entry in indexed.items():
+            stat = files.pop(entry["filename"], None)
+            if stat is not None:
+                entry["size"] = stat.st_size
+                entries[key] = entry
+
+        for filename, stat in files.items():
+            match = CACHED_FILENAME.match(filename)
+            if match is not None and match.group(1) not in entries:
+                entries[match.group(1)] = {
+                    "filename": filename,
+                    "size": stat.st_size,
+                    "last_used": stat.st_mtime,
+                    "hits": 0
+                }
+
+        return OrderedDict(sorted(entries.items(), key=lambda item: item[1]["last_used"]))
+
+    @staticmethod
+    def get_key(
+            text: str,
+            engine: str,
+            voice: str,
+            audio_format: str,
+            lang_code: str
+        ) -> str:
+        """
+        Get the cache key for audio synthesized from the given text and voice settings.
+
+        :param text: The text to synthesize.
+        :param engine: The engine type.
+        :param voice: The voice ID to use for synthesis.
+        :param audio_format: The audio format.
+        :param lang_code: The language code for the text.
+
+        :return: The cache key.
+        """
+        return hashlib.sha256(
+            "\x00".join((engine, voice, audio_format, lang_code, text)).encode("utf-8")
+        ).hexdigest()
+
+    def get(
+            self,
+            key: str
+        ) -> Optional[str]:
+        """
+        Look up a cached audio file and mark it as recently used.
+
+        :param key: The cache key.
+
+        :return: The path of the cached audio file, or None if it isn't cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            path = os.path.join(self.cache_dir, entry["filename"])
+            if not os.path.isfile(path):
+                self._total_bytes -= entry["size"]
+                del self._entries[key]
+                return None
+
+            entry["last_used"] = time.time()
+            entry["hits"] += 1
+            self._entries.move_to_end(key)
+            return path
+
+    def put(
+            self,
+            key: str,
+            audio_filename: str,
+            extension: str
+        ):
+        """
+        Copy a synthesized audio file into the cache, evicting the least recently used files if the cache grows over its size limit. The copy is written to a temporary file first so other threads never read a partial file.
+
+        :param key: The cache key.
+        :param audio_filename: The synthesized audio file.
+        :param extension: The file extension for the cached audio file.
+        """
+        filename = f"{key}.{extension}"
+        path = os.path.join(self.cache_dir, filename)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(audio_filename, temp_path)
+            os.replace(temp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            logging.warning(f"Failed to cache audio {audio_filename}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous["size"]
+            self._entries[key] = {
+                "filename": filename,
+                "size": size,
+                "last_used": time.time(),
+                "hits": 0
+            }
+            self._total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        """
+        Remove least recently used files until the cache is within its size limit. Must be called with the lock held.
+        """
+        while self._total_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry["size"]
+            try:
+                os.remove(os.path.join(self.cache_dir, entry["filename"]))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"Failed to evict cached audio {entry['filename']}: {e}")
+
+    def save(self):
+        """
+        Write the cache index to disk so it can be reused by later runs.
+        """
+        with self._lock:
+            entries = dict(self._entries)
+
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            logging.warning(f"Failed to save audio cache index {self.index_path}: {e}")
@@ -3,15 +3,66 @@ Interactive Package Cleanup Tool
 
 This script provides an interactive way to identify and remove all packages
 and their dependencies in the current Python environment that are not listed 
-in the `requirements.txt` file. 
+in the `requirements.txt` file. Packages to keep can also be passed with
+`--keep pkg1,pkg2` to run it non-interactively.
 
 Requirements:
 - `requirements.txt` file must be present in the same directory as the script.
-- The `pipdeptree` package must be installed to analyze package dependencies.
+- The `packaging` package must be installed to analyze package dependencies.
 """
 
+import argparse
+import importlib.metadata as md
+import re
 import subprocess
-from typing import Optional, Set
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Optional, Set
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.utils import canonicalize_name
+
+# Packages that are part of the base environment and must never be removed.
+# packaging is a required package of this script so it cannot be removed either
+EXCLUDED_PACKAGES = {
+    "pip", "setuptools", "wheel", "distribute", "packaging"
+}
+
+# Characters which end the package name in a requirement line (version specifiers, extras, markers, urls)
+REQUIREMENT_NAME_END = re.compile(r"[=<>!~;@\[ ]")
+
+# ANSI color codes for styled output
+ANSI_COLORS = MappingProxyType({
+    "black": 30, "red": 31, "green": 32, "yellow": 33,
+    "blue": 34, "magenta": 35, "cyan": 36, "white": 37
+})
+ANSI_BACKGROUNDS = MappingProxyType({color: code + 10 for color, code in ANSI_COLORS.items()})
+ANSI_RESET = "\033[0m"
+
+@lru_cache(maxsize=64)
+def _ansi_prefix(
+        color: Optional[str],
+        background: Optional[str],
+        bold: bool,
+        underline: bool
+    ) -> str:
+    """
+    Build the ANSI escape sequence for a combination of styles.
+    """
+    ansi_codes = []
+
+    # Append specified codes
+    if color and color in ANSI_COLORS:
+        ansi_codes.append(str(ANSI_COLORS[color]))
+    if background and background in ANSI_BACKGROUNDS:
+        ansi_codes.append(str(ANSI_BACKGROUNDS[background]))
+    if bold:
+        ansi_codes.append("1")
+    if underline:
+        ansi_codes.append("4")
+
+    # Combine all codes
+    return f"\033[{';'.join(ansi_codes)}m" if ansi_codes else ""
 
 def style_text(
         text: str,
@@ -33,106 +84,135 @@ def style_text(
     
     :param background: The background color. Same options as `color`.
     """
-    ansi_codes = []
-    
-    # Define color codes
-    colors = {
-        "black": 30, "red": 31, "green": 32, "yellow": 33,
-        "blue": 34, "magenta": 35, "cyan": 36, "white": 37
-    }
-    backgrounds = {color: code + 10 for color, code in colors.items()}
-
-    # Append specified codes
-    if color and color in colors:
-        ansi_codes.append(str(colors[color]))
-    if background and background in backgrounds:
-        ansi_codes.append(str(backgrounds[background]))
-    if bold:
-        ansi_codes.append("1")
-    if underline:
-        ansi_codes.append("4")
-
-    # Combine all codes and wrap the text
-    ansi_start = f"\033[{';'.join(ansi_codes)}m" if ansi_codes else ""
-    ansi_end = "\033[0m"
-
-    print(f"{ansi_start}{text}{ansi_end}")
+    print(f"{_ansi_prefix(color, background, bold, underline)}{text}{ANSI_RESET}")
 
 def parse_requirements_file(
         filepath: str
     ) -> Set[str]:
     """
-    Parse requirements file to extract package names.
+    Parse requirements file to extract package names, ignoring comments and version specifiers.
     """
-    packages = set()
-    with open(filepath, "r") as file:
-        for line in file:
-            package_name = line.split("==")[0]
-            packages.add(package_name)
-    return packages
-
-def get_packages(
-        case: str
-    ) -> Set[str]:
+    return {
+        canonicalize_name(REQUIREMENT_NAME_END.split(line, maxsplit=1)[0].strip())
+        for line in Path(filepath).read_text().splitlines()
+        if line.strip() and not line.lstrip().startswith("#")
+    }
 
+def get_installed_packages() -> Dict[str, Set[str]]:
     """
-    Get set of package names from the output of a subprocess.
+    Get all installed packages in the environment mapped to the packages they require.
     """
-    # Excluded packages to not be returned in the results
-    # pipdeptree is a required package so it cannot be removed
-    excluded_packages = {
-        "pipdeptree"
-    }
+    installed_packages = {}
+    for dist in md.distributions():
+        # Skip broken or partially removed distributions which have no name
+        name = dist.metadata["Name"]
+        if not name:
+            style_text(
+                text="Warning: skipping an installed distribution with no name in its metadata",
+                color="yellow"
+            )
+            continue
 
-    # Define commands
-    commands = {
-        "requirements": ["pip", "freeze"],
-        "dependencies": ["pipdeptree", "-d", "0"]
-    }
-    command = commands.get(case)
-    if command is None:
-        raise ValueError(f"Invalid case: {case}")
-    
-    # Run subprocess to get packages
-    subprocess_output = subprocess.run(
-        command,
-        capture_output=True,
-        text=True,
-        check=True
-    )
+        package_name = canonicalize_name(name)
+        if package_name in EXCLUDED_PACKAGES:
+            continue
 
-    # Get all packages without version info
-    packages = {
-        line.split("==")[0] 
-        for line in subprocess_output.stdout.splitlines() 
-        if line.split("==")[0] not in excluded_packages
-    }
+        # Only keep requirements which apply to the current environment, ignoring extras
+        requires = set()
+        for requirement_str in dist.requires or []:
+            try:
+                requirement = Requirement(requirement_str)
+            except InvalidRequirement:
+                style_text(
+                    text=f"Warning: skipping invalid requirement '{requirement_str}' of {name}",
+                    color="yellow"
+                )
+                continue
+            if requirement.marker is None or requirement.marker.evaluate({"extra": ""}):
+                requires.add(canonicalize_name(requirement.name))
+        installed_packages[package_name] = requires
 
-    return packages
+    return installed_packages
 
-def get_new_independent_packages(
-        requirements_filepath: str
-    ) -> Set[str]:
+def is_installed(
+        package: str
+    ) -> bool:
     """
-    Based on known package requirements in the requirements file and all installed packages in the environment, return all newly installed packages which do not have have any dependencies.
+    Check if a package is currently installed in the environment.
     """
-    # Get all packages from the requirements file
-    current_packages = parse_requirements_file(requirements_filepath)
+    try:
+        md.distribution(package)
+    except md.PackageNotFoundError:
+        return False
+    return True
 
-    # Get all installed packages in the environment
-    installed_packages = get_packages(case="requirements")
+def get_reverse_dependencies(
+        installed_packages: Dict[str, Set[str]]
+    ) -> Dict[str, Set[str]]:
+    """
+    Map each installed package to the installed packages which depend on it.
+    """
+    reverse_dependencies = {package: set() for package in installed_packages}
+    for package, requires in installed_packages.items():
+        for dependency in requires:
+            if dependency in reverse_dependencies:
+                reverse_dependencies[dependency].add(package)
+    return reverse_dependencies
 
-    # Find all installed packages which are not included in the requirements file
-    new_packages = installed_packages - current_packages
+def remove_packages(
+        packages: Set[str],
+        installed_packages: Dict[str, Set[str]],
+        reverse_dependencies: Dict[str, Set[str]]
+    ) -> Set[str]:
+    """
+    Remove uninstalled packages from the dependency graph and return the packages left without any dependents.
+    """
+    exposed_packages = set()
+    for package in packages:
+        reverse_dependencies.pop(package, None)
+        for dependency in installed_packages.pop(package, set()):
+            dependents = reverse_dependencies.get(dependency)
+            if dependents is None:
+                continue
+            dependents.discard(package)
+            if not dependents:
+                exposed_packages.add(dependency)
+    return exposed_packages - packages
 
-    # Identify all installed packages without any dependencies
-    dependency_free_packages = get_packages(case="dependencies")
+def get_new_independent_packages(
+        current_packages: Set[str],
+        reverse_dependencies: Dict[str, Set[str]]
+    ) -> Set[str]:
+    """
+    Based on known package requirements from the requirements file and all installed packages in the environment, return all newly installed packages which do not have have any dependencies.
+    """
+    # Return all installed packages not included in the requirements file which have no dependencies
+    return {
+        package
+        for package, dependents in reverse_dependencies.items()
+        if not dependents and package not in current_packages
+    }
 
-    # Return all newly installed packages which have no dependencies
-    return new_packages & dependency_free_packages
+def parse_package_list(
+        raw: str
+    ) -> Set[str]:
+    """
+    Parse a comma or whitespace separated list of package names.
+    """
+    return {canonicalize_name(package) for package in raw.replace(",", " ").split()}
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Remove installed packages not listed in the requirements file, along with their unneeded dependencies."
+    )
+    parser.add_argument(
+        "--keep",
+        help="Comma-separated packages to keep. Skips the interactive prompt when given."
+    )
+    args = parser.parse_args()
+
     req_filepath = "requirements.txt"
+    current_packages = parse_requirements_file(req_filepath)
 
     # Identify all newly installed packages which do not have any dependencies
     style_text(
@@ -140,44 +220,70 @@ def main():
         color="cyan",
         bold=True
     )
+    installed_packages = get_installed_packages()
+
+    # Skip the dependency analysis when every installed package is already in the requirements file
+    if installed_packages.keys() <= current_packages:
+        style_text(
+            text="\nNo independent packages to keep or uninstall.",
+            color="green",
+            bold=True
+        )
+        return
+
+    reverse_dependencies = get_reverse_dependencies(installed_packages)
     packages_of_interest = get_new_independent_packages(
-        requirements_filepath=req_filepath
+        current_packages=current_packages,
+        reverse_dependencies=reverse_dependencies
     )
     if packages_of_interest:
         print(f"Independent packages: {packages_of_interest}")
 
-        # Get user input to keep any amount of the new packages
-        packages_to_keep = set()
-        while True:
-            user_input = input("Enter a package to keep (type 'n' when finished): ").strip()
-            if user_input == 'n':
-                break
-            if user_input:
-                packages_to_keep.add(user_input)
+        # Get packages to keep from the command line, or from user input if none were given
+        if args.keep is None:
+            args.keep = input("Packages to keep (comma-separated, empty for none): ")
+        packages_to_keep = parse_package_list(args.keep)
 
         # Iteratively remove new packages that do not want to be kept and all unneeded dependencies
         while True:
-            # Re-identify all new packages which do not have any dependencies
-            style_text(
-                text="\nRe-identifying independent packages...",
-                color="yellow",
-                bold=True
-            )
-            packages_of_interest = get_new_independent_packages(
-                requirements_filepath=req_filepath
-            )
-
-            # Uninstall each package without a confirmation
+            # Uninstall all packages in a single pip call without a confirmation
             packages_to_uninstall = packages_of_interest - packages_to_keep
             if packages_to_uninstall:
                 print(f"Packages to uninstall: {packages_to_uninstall}")
-                for package in packages_to_uninstall:
+                style_text(
+                    text=f"\nUninstalling {', '.join(sorted(packages_to_uninstall))}...",
+                    color="red",
+                    bold=True
+                )
+                subprocess.run(["pip", "uninstall", "-y", *packages_to_uninstall])
+                uninstalled_packages = {
+                    package
+                    for package in packages_to_uninstall
+                    if not is_installed(package)
+                }
+
+                # Stop if nothing changed in the environment, since the results would be identical
+                if not uninstalled_packages:
                     style_text(
-                        text=f"\nUninstalling {package}...",
+                        text="\nFailed to uninstall packages.",
                         color="red",
                         bold=True
                     )
-                    subprocess.run(["pip", "uninstall", "-y", package])
+                    break
+
+                # Re-identify new packages which no longer have any dependencies, only looking
+                # at the requirements of the packages that were just uninstalled
+                style_text(
+                    text="\nRe-identifying independent packages...",
+                    color="yellow",
+                    bold=True
+                )
+                exposed_packages = remove_packages(
+                    uninstalled_packages,
+                    installed_packages=installed_packages,
+                    reverse_dependencies=reverse_dependencies
+                )
+                packages_of_interest = exposed_packages - current_packages
             else:
                 style_text(
                     text="\nNo more packages to uninstall.",
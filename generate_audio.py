@@ -3,20 +3,59 @@ This script generates audio files from text. The text is synthesized into audio
 """
 
 import logging
+import logging.handlers
 import sys
 import os
-from dotenv import load_dotenv 
+import atexit
 import csv
-from nanoid import generate
-from typing import List, Dict, Any
-import polars as pl
+import io
+import queue
+from typing import BinaryIO, Iterator, List, Dict, Optional, Tuple, TypedDict
 import subprocess
 import boto3
+from botocore.config import Config
+from botocore.exceptions import SSOTokenLoadError, TokenRetrievalError, UnauthorizedSSOTokenError
 from polly_wrapper import PollyWrapper
+from audio_cache import AudioCache
 import random
+import secrets
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
+
+# Errors raised when the SSO session for a profile has expired
+SSO_TOKEN_ERRORS = (SSOTokenLoadError, TokenRetrievalError, UnauthorizedSSOTokenError)
+
+# Sessions and PollyWrapper objects already created for each AWS profile
+_polly_cache: Dict[Tuple[str, int], Tuple[boto3.Session, PollyWrapper]] = {}
+
+class PollyAuthenticationError(Exception):
+    """Raised when a PollyWrapper can't be created because AWS SSO authentication failed."""
+
+class RequestText(TypedDict):
+    """A piece of text to convert to audio and the voice to speak it."""
+    request_id: int
+    text_speaker: str
+    request_text: str
+
+class EnvVariables(TypedDict):
+    """Settings loaded from the environment."""
+    AWS_PROFILE: str
+    POLLY_S3_BUCKET: Optional[str]
+    MAX_CONCURRENCY: int
+    CACHE_MAX_BYTES: int
+
+# Maximum number of characters Polly accepts in a single synchronous synthesize_speech call
+SYNTHESIZE_CHARACTER_LIMIT = 3000
+
+# Pieces of text to convert to audio
+REQUEST_TEXTS = (
+    "The path to discovery is rarely a straight line. Throughout history, explorers have ventured into the unknown, driven by an unyielding curiosity and a desire to uncover the secrets of our world.",
+)
 
 def log_audio_map(
-        text_audio_map: str,
+        text_audio_map: Dict[str, str],
         file_storage_dir: str, 
         file_log_name: str
     ):
@@ -27,22 +66,111 @@ def log_audio_map(
     :param file_storage_dir: The directory to store the log file.
     :param file_log_name: The name of the log file.
     """
-
-    # Check for existence of file
     filepath = os.path.join(file_storage_dir, file_log_name)
-    file_exists = os.path.isfile(filepath)
-
-    # Record mappings of text and filenames for the audio
-    with open(filepath, 'a', newline='') as f:
-        writer = csv.writer(f)
+    with open(filepath, 'ab', buffering=1 << 20) as f:
+        # Build the mappings of text and filenames for the audio in memory
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
 
-        # If the file doesn't exist, write the header first
-        if not file_exists:
+        # If the file is new or empty, write the header first
+        if f.tell() == 0:
             writer.writerow(['Filename', 'Text'])
 
-        # Write each item in the dictionary to the CSV
-        for filename, text in text_audio_map.items():
-            writer.writerow([filename, text])
+        # Write all items in the dictionary to the CSV at once
+        writer.writerows(text_audio_map.items())
+
+        # Append the encoded content to the file in a single write
+        f.write(buffer.getvalue().encode('utf-8'))
+
+class AudioMapLogger:
+    """
+    Buffers mappings of text to audio filenames and logs them to a CSV file in bulk.
+
+    Use as a context manager so any buffered mappings are written when the block exits, including on errors.
+    """
+
+    def __init__(
+            self,
+            file_storage_dir: str,
+            file_log_name: str,
+            force_flush_after: int = 1000
+        ):
+        """
+        :param file_storage_dir: The directory to store the log file.
+        :param file_log_name: The name of the log file.
+        :param force_flush_after: The number of buffered mappings after which they are written without waiting for the block to exit.
+        """
+        self.file_storage_dir = file_storage_dir
+        self.file_log_name = file_log_name
+        self.force_flush_after = force_flush_after
+        self._rows = {}
+
+    def __enter__(self) -> "AudioMapLogger":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def add(
+            self,
+            filename: str,
+            text: str
+        ):
+        """
+        Buffer the mapping of an audio filename to its text.
+
+        :param filename: The audio filename.
+        :param text: The text synthesized into the audio file.
+        """
+        self._rows[filename] = text
+        if len(self._rows) >= self.force_flush_after:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all buffered mappings to the CSV file.
+        """
+        if self._rows:
+            log_audio_map(
+                self._rows,
+                self.file_storage_dir,
+                self.file_log_name
+            )
+            self._rows = {}
+
+@contextmanager
+def open_output_file(
+        output_filename: str
+    ) -> Iterator[BinaryIO]:
+    """
+    Opens a partial file next to the output file for writing and renames it onto the output file once the block completes, so the output file is never seen half-written. The partial file is removed if the block raises.
+
+    :param output_filename: The filename to publish the written file as.
+
+    :return: The partial file opened for binary writing.
+    """
+    part_filename = f"{output_filename}.part"
+    try:
+        with open(part_filename, "wb", buffering=1 << 20) as part_file:
+            yield part_file
+        os.replace(part_filename, output_filename)
+    except BaseException:
+        if os.path.exists(part_filename):
+            os.remove(part_filename)
+        raise
+
+def copy_audio_file(
+        source_filename: str,
+        output_filename: str
+    ):
+    """
+    Copies an audio file to the output file, publishing it only once the copy is complete.
+
+    :param source_filename: The audio file to copy.
+    :param output_filename: The filename to save the copy as.
+    """
+    with open(source_filename, "rb") as source_file, open_output_file(output_filename) as output_file:
+        shutil.copyfileobj(source_file, output_file, length=1 << 17)
 
 def write_text_to_audio(
         polly_wrapper: PollyWrapper, 
@@ -51,7 +179,8 @@ def write_text_to_audio(
         engine: str, 
         voice: str, 
         audio_format: str,
-        lang_code: str
+        lang_code: str,
+        audio_cache: Optional[AudioCache] = None
     ) -> bool:
     """
     Synthesizes and writes the given text to audio and saves the output locally.
@@ -63,9 +192,23 @@ def write_text_to_audio(
     :param voice: The voice ID to use for synthesis.
     :param audio_format: The audio format. MP3, OGG (Vorbis), and PCM are supported.
     :param lang_code: The language code for the text.
+    :param audio_cache: The cache of previously synthesized audio to reuse. Caching is disabled if None.
 
     :return: True if the audio was successfully written to the output file, False otherwise.
     """
+    # Reuse previously synthesized audio for the same text and voice settings
+    cache_key = None
+    if audio_cache is not None:
+        cache_key = AudioCache.get_key(text, engine, voice, audio_format, lang_code)
+        cache_path = audio_cache.get(cache_key)
+        if cache_path is not None:
+            try:
+                copy_audio_file(cache_path, output_filename)
+                logging.info(f"Audio saved to {output_filename} from cache")
+                return True
+            except OSError as e:
+                logging.warning(f"Failed to copy cached audio {cache_path}: {e}")
+
     audio_stream = None
     write_success = False
     try:
@@ -83,42 +226,159 @@ def write_text_to_audio(
     # Save the audio stream locally
     if audio_stream:
         try:
-            with open(output_filename, "wb") as audio_file:
-                audio_file.write(audio_stream.read())
+            with open_output_file(output_filename) as audio_file:
+                shutil.copyfileobj(audio_stream, audio_file, length=1 << 17)
             write_success = True
             logging.info(f"Audio saved to {output_filename}")
         except Exception as e:
             logging.error(f"Failed to save audio to {output_filename}: {e}")
+        finally:
+            # Release the underlying connection back to the client's pool
+            audio_stream.close()
+
+        if write_success and audio_cache is not None:
+            audio_cache.put(cache_key, output_filename, extension=os.path.splitext(output_filename)[1].lstrip("."))
     else:
         logging.error("Audio stream is None. No file was saved.")
 
     return write_success
 
-def get_random_voice_id(
+def write_texts_to_audio(
         polly_wrapper: PollyWrapper,
+        tasks: List[Tuple[RequestText, str]],
         engine: str,
-        language_code: str 
-    ) -> str:
+        audio_format: str,
+        lang_code: str,
+        max_workers: int,
+        audio_map_logger: AudioMapLogger,
+        audio_cache: Optional[AudioCache] = None
+    ):
     """
-    Get a random voice ID for the given engine and language code.
-    
+    Synthesizes each piece of text concurrently and saves the outputs locally. Each request waits on Polly over the network, so the requests are run in a thread pool. Requests for the same text and voice are only synthesized once.
+
+    :param polly_wrapper: An instance of PollyWrapper.
+    :param tasks: A list of (request row, output filename) pairs.
+    :param engine: The engine type.
+    :param audio_format: The audio format. MP3, OGG (Vorbis), and PCM are supported.
+    :param lang_code: The language code for the text.
+    :param max_workers: The maximum number of concurrent synthesis requests.
+    :param audio_map_logger: The logger to record each successfully written audio file and its text.
+    :param audio_cache: The cache of previously synthesized audio to reuse. Caching is disabled if None.
+    """
+    # Group requests for the same text and voice so each pair is only synthesized once
+    duplicate_tasks = {}
+    for row, output_file in tasks:
+        duplicate_tasks.setdefault((row["request_text"], row["text_speaker"]), []).append((row, output_file))
+
+    # Bind the settings shared by every request once
+    synthesize = partial(
+        write_text_to_audio,
+        polly_wrapper=polly_wrapper,
+        engine=engine,
+        audio_format=audio_format,
+        lang_code=lang_code,
+        audio_cache=audio_cache
+    )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for (request_text, text_speaker), group in duplicate_tasks.items():
+            row, output_file = group[0]
+            logging.info(f"Processing request ID: {row['request_id']}")
+            future = executor.submit(
+                synthesize,
+                text=request_text,
+                output_filename=output_file,
+                voice=text_speaker
+            )
+            futures[future] = group
+
+        for future in as_completed(futures):
+            group = futures[future]
+            synthesized_file = group[0][1]
+            write_success = future.result()
+            for row, output_file in group:
+                # Copy the synthesized audio to each duplicate request
+                if write_success and output_file != synthesized_file:
+                    try:
+                        copy_audio_file(synthesized_file, output_file)
+                        logging.info(f"Audio saved to {output_file} from request ID: {group[0][0]['request_id']}")
+                    except OSError as e:
+                        logging.error(f"Failed to copy audio to {output_file} for request ID {row['request_id']}: {e}")
+                        continue
+
+                if write_success:
+                    audio_map_logger.add(output_file, row["request_text"])
+                else:
+                    logging.error(f"Failed to process request ID: {row['request_id']}")
+
+def write_texts_to_audio_batch(
+        polly_wrapper: PollyWrapper,
+        tasks: List[Tuple[RequestText, str]],
+        engine: str,
+        audio_format: str,
+        lang_code: str,
+        s3_bucket: str,
+        audio_map_logger: AudioMapLogger
+    ):
+    """
+    Synthesizes all pieces of text as asynchronous Polly tasks written to S3 and downloads the outputs locally.
+
+    :param polly_wrapper: An instance of PollyWrapper.
+    :param tasks: A list of (request row, output filename) pairs.
+    :param engine: The engine type.
+    :param audio_format: The audio format. MP3, OGG (Vorbis), and PCM are supported.
+    :param lang_code: The language code for the text.
+    :param s3_bucket: The S3 bucket the synthesis tasks write their output to.
+    :param audio_map_logger: The logger to record each successfully written audio file and its text.
+    """
+    for row, _ in tasks:
+        logging.info(f"Processing request ID: {row['request_id']}")
+
+    try:
+        downloaded = set(polly_wrapper.synthesize_batch(
+            requests=[(row["request_text"], row["text_speaker"], output_file) for row, output_file in tasks],
+            engine=engine,
+            audio_format=audio_format,
+            s3_bucket=s3_bucket,
+            lang_code=lang_code
+        ))
+    except Exception as e:
+        logging.error(f"Failed to start synthesis tasks: {e}")
+        downloaded = set()
+
+    for row, output_file in tasks:
+        if output_file in downloaded:
+            logging.info(f"Audio saved to {output_file}")
+            audio_map_logger.add(output_file, row["request_text"])
+        else:
+            logging.error(f"Failed to process request ID: {row['request_id']}")
+
+def get_voice_ids(
+        polly_wrapper: PollyWrapper,
+        engine: str,
+        language_code: str
+    ) -> Tuple[str, ...]:
+    """
+    Get the voice IDs available for the given engine and language code. The lookup is cached by the PollyWrapper until its voice metadata is refreshed.
+
     :param polly_wrapper: An instance of PollyWrapper.
     :param engine: The engine type.
     :param language_code: The language code.
-    
-    :return: A random voice ID.
+
+    :return: A tuple of voice IDs.
     """
     voices_dict = polly_wrapper.get_voices(
-        engine=engine, 
+        engine=engine,
         language_code=language_code
     )
-    return random.choice(list(voices_dict.values()))
+    return tuple(voices_dict.values())
 
 def get_request_texts(
         polly_wrapper: PollyWrapper,
         engine: str,
         language_code: str
-    ) -> List[Dict[str, Any]]:
+    ) -> List[RequestText]:
     """
     Helper function to retrieve the pieces of text to convert to audio.
 
@@ -128,32 +388,24 @@ def get_request_texts(
 
     :return: A list of dictionaries containing the request_id, text_speaker, and request_text.
     """
-    num_rows = 1
-    schema = {
-        "request_id": pl.Int64,
-        "text_speaker": pl.Utf8,
-        "request_text": pl.Utf8
-    }
-    data = {
-        "request_id": range(1, num_rows + 1),
-        "text_speaker": [
-            get_random_voice_id(
-                polly_wrapper=polly_wrapper,
-                engine=engine, 
-                language_code=language_code
-            ) 
-            for _ in range(num_rows)
-        ],
-        "request_text": [
-            "The path to discovery is rarely a straight line. Throughout history, explorers have ventured into the unknown, driven by an unyielding curiosity and a desire to uncover the secrets of our world."
-        ]
-    }
-
-    req_texts_df = pl.DataFrame(data, schema)
-
-    req_texts_dicts = req_texts_df.to_dicts()
+    # Pick a random voice for every piece of text at once
+    text_speakers = random.choices(
+        get_voice_ids(
+            polly_wrapper=polly_wrapper,
+            engine=engine,
+            language_code=language_code
+        ),
+        k=len(REQUEST_TEXTS)
+    )
 
-    return req_texts_dicts
+    return [
+        {
+            "request_id": request_id,
+            "text_speaker": text_speaker,
+            "request_text": request_text
+        }
+        for request_id, (text_speaker, request_text) in enumerate(zip(text_speakers, REQUEST_TEXTS), start=1)
+    ]
 
 def authenticate_aws_sso(
         profile_name: str
@@ -164,47 +416,72 @@ def authenticate_aws_sso(
     :param profile_name: The AWS profile name to use for authentication.
     """
     try:
-        subprocess.run(["aws", "sso", "login", "--profile", profile_name])
+        subprocess.run(
+            ["aws", "sso", "login", "--profile", profile_name],
+            check=True,
+            timeout=120,
+            stdin=subprocess.DEVNULL
+        )
         logging.info("Successfully authenticated with AWS SSO.")
-    except Exception as e:
+    except (subprocess.SubprocessError, OSError) as e:
         logging.error(f"Failed to authenticate with AWS SSO: {e}")
 
 def get_polly_wrapper(
-        profile_name: str
+        profile_name: str,
+        max_pool_connections: int = 10
     ) -> PollyWrapper:
     """
     Get a PollyWrapper object for interacting with the AWS Polly service.
     
     :param profile_name: The AWS profile name to use for authentication.
+    :param max_pool_connections: The maximum number of connections each client keeps open. Should be at least the number of concurrent requests.
 
     :return: A PollyWrapper object.
+
+    :raises PollyAuthenticationError: If the SSO session can't be re-authenticated.
     """
-    attempts = 0
-    max_auth_attempts = 2
-    while attempts < max_auth_attempts:
+    # Reuse the cached wrapper for the profile while its session credentials are still valid
+    cache_key = (profile_name, max_pool_connections)
+    if cache_key in _polly_cache:
+        session, polly = _polly_cache[cache_key]
         try:
-            # Create a session and clients
-            session = boto3.Session(profile_name=profile_name)
-            polly_client = session.client("polly")
-            s3_resource = session.resource("s3")
+            credentials = session.get_credentials()
+            if credentials is not None:
+                credentials.get_frozen_credentials()
+                return polly
+        except SSO_TOKEN_ERRORS:
+            logging.info("Cached SSO session expired.")
+        del _polly_cache[cache_key]
+
+    # Transient AWS errors are retried by botocore itself, so only expired SSO sessions are handled here
+    client_config = Config(
+        max_pool_connections=max_pool_connections,
+        retries={"max_attempts": 3, "mode": "adaptive"}
+    )
+
+    # Create a session and clients once, since they pick up refreshed SSO credentials on their next call
+    session = boto3.Session(profile_name=profile_name)
+    polly_client = session.client("polly", config=client_config)
+    s3_resource = session.resource("s3", config=client_config)
 
-            # Initialize the PollyWrapper object
-            polly = PollyWrapper(polly_client, s3_resource)
+    # Initialize the PollyWrapper object
+    polly = PollyWrapper(polly_client, s3_resource)
 
-            # Placeholder call to test the connection
-            test_result = polly.describe_voices()
+    max_auth_attempts = 2
+    for attempt in range(1, max_auth_attempts + 1):
+        try:
+            # Test the connection, which also loads the voice metadata used to pick speakers
+            polly.describe_voices()
 
+            _polly_cache[cache_key] = (session, polly)
             return polly
-        except:
-            if attempts < max_auth_attempts:
-                logging.info(f"SSO session expired. Attempt {attempts + 1} of {max_auth_attempts} to re-authenticate.")
+        except SSO_TOKEN_ERRORS:
+            if attempt < max_auth_attempts:
+                logging.info(f"SSO session expired. Attempt {attempt} of {max_auth_attempts - 1} to re-authenticate.")
                 authenticate_aws_sso(profile_name)
-            attempts += 1
 
     # When max authentication attempts are reached
-    logging.error("Max retries reached. Unable to authenticate.")
-    logging.error("No PollyWrapper object returned. Exiting.")
-    sys.exit(1)
+    raise PollyAuthenticationError(f"Unable to authenticate profile {profile_name} after {max_auth_attempts} attempts.")
 
 def configure_logging(
         logging_dir: str, 
@@ -216,27 +493,70 @@ def configure_logging(
     :param logging_dir: The directory to store the log files.
     :param logging_file: The name of the log file.
     """
-    if not os.path.exists(logging_dir):
-        os.makedirs(logging_dir)
+    os.makedirs(logging_dir, exist_ok=True)
+
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handlers = [
+        logging.FileHandler(os.path.join(logging_dir, logging_file)),
+        logging.StreamHandler()
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Worker threads only put records on a queue, and a background listener writes them to the handlers
+    log_queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter())
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
 
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(os.path.join(logging_dir, logging_file)),
-            logging.StreamHandler()
-        ]
+        handlers=[queue_handler]
     )
+    listener.start()
+    atexit.register(listener.stop)
+
+def get_int_env_variable(
+        name: str,
+        default: int,
+        minimum: int
+    ) -> int:
+    """
+    Reads an integer setting from the environment.
 
-def load_env_variables() -> Dict[str, str]:
+    :param name: The name of the environment variable.
+    :param default: The value to use if the variable is unset or empty.
+    :param minimum: The smallest allowed value.
+
+    :return: The integer value of the environment variable.
+    """
+    value = os.environ.get(name)
+    if not value:
+        return default
+
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}") from None
+    if number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}, got {number}")
+    return number
+
+def load_env_variables() -> EnvVariables:
     """
     Loads environment variables and returns them as a dictionary.
 
     :return: A dictionary containing the environment variables.
     """
+    # Imported here since it's only needed once at startup
+    from dotenv import load_dotenv
+
     load_dotenv()
     return {
-        "AWS_PROFILE": os.environ["AWS_PROFILE"]
+        "AWS_PROFILE": os.environ["AWS_PROFILE"],
+        "POLLY_S3_BUCKET": os.environ.get("POLLY_S3_BUCKET"),
+        "MAX_CONCURRENCY": get_int_env_variable("MAX_CONCURRENCY", default=8, minimum=1),
+        "CACHE_MAX_BYTES": get_int_env_variable("CACHE_MAX_BYTES", default=1 << 30, minimum=0)
     }
 
 def main():
@@ -254,11 +574,24 @@ def main():
 
     # Handle storage to dump files into
     file_storage_dir = './generated_files'
-    if not os.path.exists(file_storage_dir):
-        os.makedirs(file_storage_dir)
+    os.makedirs(file_storage_dir, exist_ok=True)
+
+    # Handle storage for previously synthesized audio, saving the cache index when the program exits
+    cache_dir = os.path.join(file_storage_dir, "cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    audio_cache = AudioCache(cache_dir, max_bytes=env_vars["CACHE_MAX_BYTES"])
+    atexit.register(audio_cache.save)
 
     # Get Polly client for text-to-speech conversion
-    polly = get_polly_wrapper(profile_name=env_vars["AWS_PROFILE"])
+    try:
+        polly = get_polly_wrapper(
+            profile_name=env_vars["AWS_PROFILE"],
+            max_pool_connections=env_vars["MAX_CONCURRENCY"]
+        )
+    except PollyAuthenticationError as e:
+        logging.error(e)
+        logging.error("No PollyWrapper object returned. Exiting.")
+        sys.exit(1)
 
     # Define parameters for text-to-speech conversion
     engine = "standard"
@@ -277,40 +610,52 @@ def main():
         language_code=language_code
     )
 
-    # Process each piece of text and convert to audio
-    text_audio_map = {}
+    # Assign a unique output file to each piece of text
+    output_prefix = os.path.join(file_storage_dir, "")
+    output_extension = audio_format_dir[audio_format]
+    tasks = []
     for row in req_texts_dicts:
-        # Extract relevant information
-        request_id = row["request_id"]
-        text_speaker = row["text_speaker"]
-        req_text = row["request_text"]
-
         # Generate a unique ID for the audio file
-        unique_id = generate(size=12)
-        output_file = os.path.join(file_storage_dir, f"{unique_id}_{text_speaker}.{audio_format_dir[audio_format]}")
-        
-        # Process the request
-        logging.info(f"Processing request ID: {request_id}")
-        write_success = write_text_to_audio(
+        unique_id = secrets.token_urlsafe(9)
+        output_file = f"{output_prefix}{unique_id}_{row['text_speaker']}.{output_extension}"
+        tasks.append((row, output_file))
+
+    # Texts over Polly's synchronous character limit can only be synthesized as asynchronous tasks through S3
+    sync_tasks = []
+    batch_tasks = []
+    for row, output_file in tasks:
+        if len(row["request_text"]) <= SYNTHESIZE_CHARACTER_LIMIT:
+            sync_tasks.append((row, output_file))
+        elif env_vars["POLLY_S3_BUCKET"]:
+            batch_tasks.append((row, output_file))
+        else:
+            logging.error(f"Request ID {row['request_id']} exceeds {SYNTHESIZE_CHARACTER_LIMIT} characters and POLLY_S3_BUCKET is not set. Skipping.")
+
+    # Process each piece of text and convert to audio, logging locations of audio and associated text
+    with AudioMapLogger(
+        file_storage_dir,
+        file_log_name="audio_to_text_map.csv"
+    ) as audio_map_logger:
+        write_texts_to_audio(
             polly_wrapper=polly,
-            text=req_text,
-            output_filename=output_file,
+            tasks=sync_tasks,
             engine=engine,
-            voice=text_speaker,
             audio_format=audio_format,
-            lang_code=language_code
+            lang_code=language_code,
+            max_workers=env_vars["MAX_CONCURRENCY"],
+            audio_map_logger=audio_map_logger,
+            audio_cache=audio_cache
         )
-        if write_success:
-            text_audio_map[output_file] = req_text
-        else:
-            logging.error(f"Failed to process request ID: {request_id}")
-
-    # Log locations of audio and associated text
-    log_audio_map(
-        text_audio_map, 
-        file_storage_dir, 
-        file_log_name="audio_to_text_map.csv"
-    )
+        if batch_tasks:
+            write_texts_to_audio_batch(
+                polly_wrapper=polly,
+                tasks=batch_tasks,
+                engine=engine,
+                audio_format=audio_format,
+                lang_code=language_code,
+                s3_bucket=env_vars["POLLY_S3_BUCKET"],
+                audio_map_logger=audio_map_logger
+            )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
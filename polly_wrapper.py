@@ -12,8 +12,9 @@ speech and manage custom lexicons.
 import io
 import json
 import logging
+import os
 import time
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +30,7 @@ class PollyWrapper:
         self.polly_client = polly_client
         self.s3_resource = s3_resource
         self.voice_metadata = None
+        self.voices_cache = {}
 
     def describe_voices(self):
         """
@@ -39,6 +41,7 @@ class PollyWrapper:
         try:
             response = self.polly_client.describe_voices()
             self.voice_metadata = response["Voices"]
+            self.voices_cache.clear()
             logger.info("Got metadata about %s voices.", len(self.voice_metadata))
         except ClientError:
             logger.exception("Couldn't get voice metadata.")
@@ -213,6 +216,112 @@ class PollyWrapper:
 
             return audio_stream, visemes
 
+    def synthesize_batch(
+        self,
+        requests,
+        engine,
+        audio_format,
+        s3_bucket,
+        lang_code=None,
+        tries=60,
+        wait_callback=None,
+    ):
+        """
+        Start an asynchronous speech synthesis task for each request, wait for the tasks to complete, and download each output from Amazon S3 directly to its local file.
+
+        All tasks are started before any are polled, so Amazon Polly processes them in parallel and the total wait is bounded by the slowest task rather than the sum of all of them.
+
+        :param requests: A list of (text, voice, output_filename) tuples to synthesize.
+
+        :param engine: The kind of engine used. Can be standard or neural.
+
+        :param audio_format: The audio format to return for synthesized speech.
+
+        :param s3_bucket: The name of an existing Amazon S3 bucket that you have write access to. Synthesis output is written to this bucket.
+
+        :param lang_code: The language code of the voice to use. This has an effect only when a bilingual voice is selected.
+
+        :param tries: The number of times to poll for the status of the outstanding tasks.
+
+        :param wait_callback: A callback function that is called after each poll, to give the caller an opportunity to take action, such as to display status.
+
+        :return: The list of output filenames that were successfully downloaded. Requests whose task couldn't be started, polled, or downloaded are left out.
+        """
+        # Start every task, skipping requests whose task couldn't be started so the others still complete
+        pending_tasks = {}
+        for text, voice, output_filename in requests:
+            key_prefix = f"{os.path.splitext(os.path.basename(output_filename))[0]}."
+            kwargs = {
+                "Engine": engine,
+                "OutputFormat": audio_format,
+                "OutputS3BucketName": s3_bucket,
+                "OutputS3KeyPrefix": key_prefix,
+                "Text": text,
+                "VoiceId": voice,
+            }
+            if lang_code is not None:
+                kwargs["LanguageCode"] = lang_code
+            try:
+                response = self.polly_client.start_speech_synthesis_task(**kwargs)
+            except (ClientError, BotoCoreError):
+                logger.exception("Couldn't start synthesis task for %s.", output_filename)
+                continue
+            task_id = response["SynthesisTask"]["TaskId"]
+            pending_tasks[task_id] = (output_filename, key_prefix)
+            logger.info("Started speech synthesis task %s.", task_id)
+
+        bucket = self.s3_resource.Bucket(s3_bucket)
+        downloaded = []
+        while pending_tasks and tries > 0:
+            for task_id in list(pending_tasks):
+                try:
+                    task = self.get_speech_synthesis_task(task_id)
+                except (ClientError, BotoCoreError):
+                    output_filename, key_prefix = pending_tasks.pop(task_id)
+                    logger.error(
+                        "Giving up on synthesis task %s for %s. Its output may be left in s3://%s/%s%s.*",
+                        task_id, output_filename, s3_bucket, key_prefix, task_id
+                    )
+                    continue
+                task_status = task["TaskStatus"]
+                if wait_callback is not None:
+                    wait_callback("speech", task_status)
+                if task_status == "completed":
+                    output_filename, _ = pending_tasks.pop(task_id)
+                    output_key = task["OutputUri"].split("/")[-1]
+                    try:
+                        bucket.download_file(output_key, output_filename)
+                    except (ClientError, BotoCoreError, OSError):
+                        logger.exception("Couldn't download output for task %s.", task_id)
+                        continue
+                    logger.info("Downloaded output for task %s to %s.", task_id, output_filename)
+                    downloaded.append(output_filename)
+
+                    # Cleaning up the S3 output is best effort, since Polly only needs permission to write to the bucket
+                    try:
+                        bucket.Object(output_key).delete()
+                    except (ClientError, BotoCoreError):
+                        logger.warning(
+                            "Couldn't delete output s3://%s/%s for task %s.", s3_bucket, output_key, task_id,
+                            exc_info=True
+                        )
+                elif task_status == "failed":
+                    pending_tasks.pop(task_id)
+                    logger.error(
+                        "Synthesis task %s failed: %s.", task_id, task.get("TaskStatusReason")
+                    )
+            if pending_tasks:
+                time.sleep(5)
+                tries -= 1
+
+        for task_id, (_, key_prefix) in pending_tasks.items():
+            logger.error(
+                "Synthesis task %s did not complete in time. Its output may be left in s3://%s/%s%s.*",
+                task_id, s3_bucket, key_prefix, task_id
+            )
+
+        return downloaded
+
     def get_speech_synthesis_task(self, task_id):
         """
         Gets metadata about an asynchronous speech synthesis task, such as its status.
@@ -325,11 +434,16 @@ class PollyWrapper:
 
         :return: The set of voices available for the specified engine type and language.
         """
+        if (engine, language_code) in self.voices_cache:
+            return self.voices_cache[(engine, language_code)]
+
         if self.voice_metadata is None:
             self.describe_voices()
 
-        return {
+        voices = {
             vo["Name"]: vo["Id"]
             for vo in self.voice_metadata
             if engine in vo["SupportedEngines"] and language_code == vo["LanguageCode"]
-        }
\ No newline at end of file
+        }
+        self.voices_cache[(engine, language_code)] = voices
+        return voices
\ No newline at end of file
@@ -27,13 +27,13 @@ def generate_requirements(
     """
     result = subprocess.run(
         ["pip", "freeze"],
-        capture_output=True,
-        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
         check=True
     )
 
     # Process the output to not include any of the excluded packages
-    package_output_lines = result.stdout.splitlines()
+    package_output_lines = result.stdout.decode("utf-8").splitlines()
     filtered_lines = []
     for line in package_output_lines:
         package_name = line.split("==")[0]
@@ -102,7 +102,7 @@ def main():
 
     # Packages to be excluded from the requirements.txt file
     requirements_excludes = [
-        "pipdeptree"
+        "packaging"
     ]
 
     # Additional exclusions from the Docker image which are not currently in the .gitignore
@@ -0,0 +1,163 @@
+"""
+Tests for the size-bounded audio cache. Run with `python -m unittest`.
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from audio_cache import AudioCache, STALE_TEMP_FILE_SECONDS
+
+class AudioCacheTest(unittest.TestCase):
+    """
+    Exercises AudioCache against a temporary cache directory.
+    """
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.cache_dir = os.path.join(temp_dir.name, "cache")
+        os.makedirs(self.cache_dir)
+        self.source_dir = temp_dir.name
+
+    def make_audio(
+            self,
+            name: str,
+            size: int = 100
+        ) -> str:
+        """
+        Write an audio file of the given size outside the cache directory.
+
+        :param name: The filename to write.
+        :param size: The number of bytes to write.
+
+        :return: The path of the written file.
+        """
+        path = os.path.join(self.source_dir, name)
+        with open(path, "wb") as f:
+            f.write(name.encode("utf-8").ljust(size, b"\0"))
+        return path
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return AudioCache.get_key(text, "neural", "Joanna", "ogg_vorbis", "en-US")
+
+    def write_index(self, content: str):
+        with open(os.path.join(self.cache_dir, AudioCache.INDEX_FILE), "w") as f:
+            f.write(content)
+
+    def read_index(self) -> dict:
+        with open(os.path.join(self.cache_dir, AudioCache.INDEX_FILE), "r") as f:
+            return json.load(f)
+
+    def test_put_then_get_returns_copy(self):
+        cache = AudioCache(self.cache_dir, max_bytes=1000)
+        source = self.make_audio("first.ogg")
+        key = self.make_key("first")
+
+        cache.put(key, source, extension="ogg")
+        path = cache.get(key)
+
+        self.assertEqual(path, os.path.join(self.cache_dir, f"{key}.ogg"))
+        with open(source, "rb") as expected, open(path, "rb") as actual:
+            self.assertEqual(expected.read(), actual.read())
+        self.assertIsNone(cache.get(self.make_key("missing")))
+
+    def test_evicts_least_recently_used_first(self):
+        cache = AudioCache(self.cache_dir, max_bytes=250)
+        keys = {text: self.make_key(text) for text in ("a", "b", "c")}
+        cache.put(keys["a"], self.make_audio("a.ogg"), extension="ogg")
+        cache.put(keys["b"], self.make_audio("b.ogg"), extension="ogg")
+
+        # Using "a" makes "b" the least recently used entry
+        self.assertIsNotNone(cache.get(keys["a"]))
+        cache.put(keys["c"], self.make_audio("c.ogg"), extension="ogg")
+
+        self.assertIsNotNone(cache.get(keys["a"]))
+        self.assertIsNone(cache.get(keys["b"]))
+        self.assertIsNotNone(cache.get(keys["c"]))
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, f"{keys['b']}.ogg")))
+
+    def test_index_is_reused_after_save(self):
+        cache = AudioCache(self.cache_dir, max_bytes=1000)
+        key = self.make_key("saved")
+        cache.put(key, self.make_audio("saved.ogg"), extension="ogg")
+        cache.save()
+
+        self.assertIn(key, self.read_index())
+        self.assertIsNotNone(AudioCache(self.cache_dir, max_bytes=1000).get(key))
+
+    def test_malformed_index_is_treated_as_empty(self):
+        malformed_indexes = (
+            "not json",
+            "null",
+            "[1, 2]",
+            '"index"',
+            '{"key": 5}',
+            '{"key": {"filename": "key.ogg"}}',
+            '{"key": {"filename": "key.ogg", "size": "big", "last_used": 0, "hits": 0}}'
+        )
+        for content in malformed_indexes:
+            with self.subTest(index=content):
+                self.write_index(content)
+                with self.assertLogs(level="WARNING"):
+                    cache = AudioCache(self.cache_dir, max_bytes=1000)
+                self.assertIsNone(cache.get("key"))
+
+    def test_adopts_unindexed_cached_files(self):
+        key = self.make_key("orphan")
+        with open(os.path.join(self.cache_dir, f"{key}.ogg"), "wb") as f:
+            f.write(b"\0" * 100)
+        with open(os.path.join(self.cache_dir, "notes.txt"), "w") as f:
+            f.write("not a cached file")
+
+        cache = AudioCache(self.cache_dir, max_bytes=1000)
+        cache.save()
+
+        self.assertEqual(cache.get(key), os.path.join(self.cache_dir, f"{key}.ogg"))
+        self.assertEqual(set(self.read_index()), {key})
+
+    def test_adopted_files_count_towards_size_limit(self):
+        keys = [self.make_key(text) for text in ("old", "new")]
+        for age, key in zip((100, 0), keys):
+            path = os.path.join(self.cache_dir, f"{key}.ogg")
+            with open(path, "wb") as f:
+                f.write(b"\0" * 100)
+            mtime = time.time() - age
+            os.utime(path, (mtime, mtime))
+
+        cache = AudioCache(self.cache_dir, max_bytes=150)
+
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertIsNotNone(cache.get(keys[1]))
+
+    def test_drops_indexed_entries_with_missing_files(self):
+        key = self.make_key("deleted")
+        self.write_index(json.dumps({
+            key: {"filename": f"{key}.ogg", "size": 100, "last_used": time.time(), "hits": 3}
+        }))
+
+        cache = AudioCache(self.cache_dir, max_bytes=1000)
+        cache.save()
+
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(self.read_index(), {})
+
+    def test_removes_only_stale_temp_files(self):
+        fresh_path = os.path.join(self.cache_dir, "fresh.ogg.1.2.tmp")
+        stale_path = os.path.join(self.cache_dir, "stale.ogg.1.2.tmp")
+        for path in (fresh_path, stale_path):
+            with open(path, "wb") as f:
+                f.write(b"\0")
+        stale_mtime = time.time() - STALE_TEMP_FILE_SECONDS - 1
+        os.utime(stale_path, (stale_mtime, stale_mtime))
+
+        AudioCache(self.cache_dir, max_bytes=1000)
+
+        self.assertTrue(os.path.exists(fresh_path))
+        self.assertFalse(os.path.exists(stale_path))
+
+if __name__ == "__main__":
+    unittest.main()